@@ -13,16 +13,27 @@ in the current working directory.
 """
 
 import argparse
+import atexit
 import calendar
 import html
 import json
+import mmap
 import os
+import re
 import subprocess
 import sys
-from collections import defaultdict
-from datetime import datetime, timedelta
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from operator import itemgetter
 from pathlib import Path
 
+# orjson parses JSONL noticeably faster than stdlib json; fall back if missing.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Default folder to watch (override with DEV_FOLDER env)
 DEFAULT_DEV_FOLDER = os.path.expanduser("~/dev")
 LOG_FILENAME = "activity.jsonl"
@@ -37,6 +48,7 @@ IGNORED_PATH_PARTS = frozenset({
 
 # Only log at most one entry per project per this many seconds
 DEBOUNCE_SECONDS = 300  # 5 minutes
+DEBOUNCE_NS = DEBOUNCE_SECONDS * 1_000_000_000  # as monotonic nanoseconds
 
 # Projects to never log (e.g. the watcher project itself). Comparison is case-insensitive.
 IGNORED_PROJECTS = frozenset({"dev-activity", "PKM-IV", "pkm-iv.code-workspace", "pkm"})
@@ -79,56 +91,84 @@ def _stable_project_name_hash(name: str) -> int:
     return h
 
 
-def get_project_name(dev_root: Path, event_path: str) -> str | None:
-    """Return the top-level project folder name under dev_root, or None."""
-    try:
-        full = Path(event_path).resolve()
-        root = dev_root.resolve()
-        if full == root or not str(full).startswith(str(root)):
-            return None
-        rel = full.relative_to(root)
-        parts = rel.parts
-        if not parts:
+def classify_event_path(
+    src_path: str,
+    root_prefix: str,
+    log_str: str,
+    graph_str: str,
+    _ignored=IGNORED_PATH_PARTS,
+    _sep=os.sep,
+) -> str | None:
+    """Return the project name for a loggable event path, or None to drop it.
+
+    This is the watcher's hot path — it runs on every filesystem event, so
+    everything stays raw string ops (no Path objects, no stat calls) with the
+    ignore set and separator pre-bound as defaults.  root_prefix is the
+    resolved dev root with a trailing separator.
+    """
+    if src_path == log_str or src_path == graph_str:
+        return None
+    # Scan the trailing segments back-to-front: ignored dirs (node_modules,
+    # __pycache__, ...) sit deep in the tree, so this usually hits in a couple
+    # of frozenset probes.  The split is bounded; the unsplit head remainder
+    # just fails the membership test.
+    for part in reversed(src_path.rsplit(_sep, 12)):
+        if part in _ignored:
             return None
-        return parts[0]
-    except (ValueError, OSError):
+    if not src_path.startswith(root_prefix):
         return None
+    rel = src_path[len(root_prefix):]
+    if not rel:
+        return None
+    return rel.split(_sep, 1)[0]
 
 
-def should_ignore_path(path: Path, log_path: Path, graph_path: Path) -> bool:
-    """True if this path should not be logged (noise or our own output)."""
-    try:
-        resolved = path.resolve()
-        if resolved == log_path.resolve() or resolved == graph_path.resolve():
-            return True
-        for part in resolved.parts:
-            if part in IGNORED_PATH_PARTS:
-                return True
-    except (ValueError, OSError):
-        pass
-    return False
-
-
-def log_activity(log_path: Path, dev_root: Path, project: str) -> None:
-    """Append one activity entry to the log file."""
+def _dumps_line(entry: dict) -> bytes:
+    """Encode one log entry as a JSONL line (bytes with trailing newline)."""
+    if orjson is not None:
+        return orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(entry) + "\n").encode()
+
+
+def log_activity(log_file, project: str, now: datetime) -> None:
+    """Append one activity entry to the (already open, binary) log file."""
     entry = {
-        "date": datetime.now().strftime("%Y-%m-%d"),
-        "ts": datetime.now().isoformat(),
+        "date": now.strftime("%Y-%m-%d"),
+        "ts": now.isoformat(),
         "project": project,
     }
-    with open(log_path, "a") as f:
-        f.write(json.dumps(entry) + "\n")
+    log_file.write(_dumps_line(entry))
+    log_file.flush()
 
 
 def run_watch(dev_folder: str) -> None:
     try:
-        from watchdog.events import FileSystemEventHandler
-        from watchdog.observers import Observer
+        from watchdog.events import (
+            FileCreatedEvent,
+            FileDeletedEvent,
+            FileModifiedEvent,
+            FileMovedEvent,
+            PatternMatchingEventHandler,
+        )
     except ImportError:
         print("Install watchdog: pip install watchdog", file=sys.stderr)
         sys.exit(1)
 
-    dev_path = Path(dev_folder)
+    # Pick the native kernel backend explicitly rather than letting watchdog
+    # autodetect (which can fall back to polling-style observers).
+    if sys.platform.startswith("linux"):
+        from watchdog.observers.inotify import InotifyObserver as Observer
+    elif sys.platform == "darwin":
+        try:
+            from watchdog.observers.fsevents import FSEventsObserver as Observer
+        except ImportError:
+            from watchdog.observers import Observer
+    else:
+        from watchdog.observers import Observer
+
+    # Resolve once so event paths (reported under the scheduled path) can be
+    # compared as raw strings against the root prefix.
+    dev_path = Path(dev_folder).resolve()
     if not dev_path.is_dir():
         print(f"Dev folder does not exist: {dev_path}", file=sys.stderr)
         sys.exit(1)
@@ -136,47 +176,62 @@ def run_watch(dev_folder: str) -> None:
     log_path = Path.cwd() / LOG_FILENAME
     graph_path = Path.cwd() / GRAPH_FILENAME
 
-    class ActivityHandler(FileSystemEventHandler):
+    class ActivityHandler(PatternMatchingEventHandler):
         def __init__(self):
-            super().__init__()
-            self._dev_root = dev_path
-            self._log_path = log_path
-            self._graph_path = graph_path
-            self._last_log: dict[str, float] = {}
+            # Ignored directories (and .DS_Store files) are dropped inside
+            # watchdog's dispatch, before events ever reach our callback.
+            super().__init__(
+                ignore_patterns=[f"*/{p}/*" for p in IGNORED_PATH_PARTS]
+                + [f"*/{p}" for p in IGNORED_PATH_PARTS],
+                ignore_directories=True,
+            )
+            self._root_prefix = str(dev_path) + os.sep
+            # Resolved once here so the per-event check is plain string compares.
+            self._log_str = str(log_path.resolve())
+            self._graph_str = str(graph_path.resolve())
+            self._last_log: dict[str, int] = {}
+            # Bound once so _record skips the module-global lookup per event.
+            self._classify = classify_event_path
+            # One long-lived binary handle: entries are written pre-encoded and
+            # flushed per write without reopening the file per event.
+            self._log_file = open(log_path, "ab")
+
+        def close(self) -> None:
+            if not self._log_file.closed:
+                self._log_file.close()
 
         def _record(self, src_path: str) -> None:
-            path = Path(src_path)
-            if should_ignore_path(path, self._log_path, self._graph_path):
-                return
-            project = get_project_name(self._dev_root, src_path)
+            project = self._classify(src_path, self._root_prefix, self._log_str, self._graph_str)
             if not project or is_ignored_project(project):
                 return
-            now = datetime.now().timestamp()
-            last = self._last_log.get(project, 0)
-            if now - last < DEBOUNCE_SECONDS:
+            # Debounce on the monotonic clock: integer compare, immune to
+            # wall-clock adjustments; datetime.now() only when actually logging.
+            now_ns = time.monotonic_ns()
+            last = self._last_log.get(project)
+            if last is not None and now_ns - last < DEBOUNCE_NS:
                 return
-            self._last_log[project] = now
-            log_activity(self._log_path, self._dev_root, project)
-
-        def on_created(self, event):
-            if not event.is_directory:
-                self._record(event.src_path)
-
-        def on_modified(self, event):
-            if not event.is_directory:
-                self._record(event.src_path)
-
-        def on_moved(self, event):
-            if not event.is_directory and event.dest_path:
-                self._record(event.dest_path)
-
-        def on_deleted(self, event):
-            if not event.is_directory:
+            self._last_log[project] = now_ns
+            log_activity(self._log_file, project, datetime.now())
+
+        def on_any_event(self, event):
+            # Opened/closed events (Linux inotify) are not activity; directory
+            # events are already filtered by ignore_directories above.
+            if event.event_type == "moved":
+                if event.dest_path:
+                    self._record(event.dest_path)
+            elif event.event_type in ("created", "modified", "deleted"):
                 self._record(event.src_path)
 
     handler = ActivityHandler()
+    atexit.register(handler.close)
     observer = Observer()
-    observer.schedule(handler, str(dev_path), recursive=True)
+    # Only the event types we record cross the dispatch boundary.
+    observer.schedule(
+        handler,
+        str(dev_path),
+        recursive=True,
+        event_filter=[FileCreatedEvent, FileModifiedEvent, FileMovedEvent, FileDeletedEvent],
+    )
     observer.start()
     print(f"Watching {dev_path} — activity logged to {log_path}", flush=True)
     print("Press Ctrl+C to stop.", flush=True)
@@ -186,27 +241,38 @@ def run_watch(dev_folder: str) -> None:
     except KeyboardInterrupt:
         observer.stop()
         observer.join()
+        handler.close()
 
 
 def load_activity(log_path: Path) -> dict[str, dict[str, int]]:
     """Load log and return date -> { project -> count }."""
-    by_date = defaultdict(lambda: defaultdict(int))
     if not log_path.exists():
-        return dict(by_date)
-    with open(log_path) as f:
-        for line in f:
-            line = line.strip()
+        return {}
+    # Flat Counter keyed on (date, project): one hash + one increment per
+    # entry instead of two nested dict lookups.
+    counts: Counter[tuple[str, str]] = Counter()
+    loads = orjson.loads if orjson is not None else json.loads
+    if log_path.stat().st_size == 0:  # mmap rejects empty files
+        return {}
+    # Memory-map the log and walk lines with a regex: a zero-copy view of the
+    # file instead of duplicating multi-MB logs into a Python bytes object.
+    with open(log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for match in re.finditer(rb"[^\n]+", mm):
+            line = match.group().strip()
             if not line:
                 continue
             try:
-                entry = json.loads(line)
+                entry = loads(line)
                 d = entry.get("date")
                 p = entry.get("project")
                 if d and p and not is_ignored_project(p):
-                    by_date[d][p] += 1
-            except json.JSONDecodeError:
+                    counts[(d, p)] += 1
+            except ValueError:
                 continue
-    return {d: dict(by_date[d]) for d in sorted(by_date)}
+    by_date: dict[str, dict[str, int]] = {}
+    for (d, p), c in counts.items():
+        by_date.setdefault(d, {})[p] = c
+    return dict(sorted(by_date.items()))
 
 
 def load_archived_projects(archive_path: Path) -> list[str]:
@@ -320,11 +386,15 @@ def generate_graph(log_path: Path, out_path: Path, open_browser: bool, archive_p
         # Still write a graph so user sees the layout
         activity = {}
 
-    # All unique projects in order of first appearance
+    # One pass over the (date-sorted, per load_activity) dict yields both the
+    # first logged date and all unique projects in order of first appearance.
+    first_date_str: str | None = None
     project_order: list[str] = []
     seen = set()
-    for d in sorted(activity):
-        for p in activity[d]:
+    for d, projs in activity.items():
+        if first_date_str is None:
+            first_date_str = d
+        for p in projs:
             if p not in seen:
                 seen.add(p)
                 project_order.append(p)
@@ -375,22 +445,26 @@ def generate_graph(log_path: Path, out_path: Path, open_browser: bool, archive_p
         if total <= 0:
             return ""
         pieces: list[str] = []
-        acc = 0.0
+        scale = 100.0 / total
+        acc = 0
+        start_pct = 0.0
         for p, c in proj_list:
-            start_pct = (acc / total) * 100
             acc += c
-            end_pct = (acc / total) * 100
+            end_pct = acc * scale
             color = color_light_for(p) if intensity == "high" else color_for(p)
             style = style_for_project(p, color)
+            # One decimal renders identically in browsers; :g drops trailing
+            # zeros, keeping the generated HTML small for years of data.
             pieces.append(
-                f'<span class="cell-segment" style="top:{start_pct:.4f}%;height:{(end_pct - start_pct):.4f}%;{style}"></span>'
+                f'<span class="cell-segment" style="top:{round(start_pct, 1):g}%;height:{round(end_pct - start_pct, 1):g}%;{style}"></span>'
             )
+            start_pct = end_pct
         return "".join(pieces)
 
     # Date range: from first log to today, or last 12 months
     today = datetime.now().date()
-    if activity:
-        first = min(datetime.strptime(d, "%Y-%m-%d").date() for d in activity)
+    if first_date_str is not None:
+        first = date.fromisoformat(first_date_str)
     else:
         first = today - timedelta(days=365)
     # Show full months
@@ -405,43 +479,58 @@ def generate_graph(log_path: Path, out_path: Path, open_browser: bool, archive_p
             m = 1
             y += 1
 
+    # Render each active day's cell once, in a single pass over the log data;
+    # the calendar loop below then only looks cells up by date key.
+    cell_by_date: dict[str, str] = {}
+    for date_key, projs in activity.items():
+        # Sort by count descending for stable stripe order; total and the
+        # tooltip come from the same single pass over the sorted pairs.
+        proj_list = sorted(projs.items(), key=itemgetter(1), reverse=True)
+        total = 0
+        tip_parts = []
+        for p, c in proj_list:
+            total += c
+            tip_parts.append(f"{p}{' (archived)' if p.casefold() in archived_set else ''}: {c}")
+        intensity = intensity_for_total(total)
+        tip = ", ".join(tip_parts)
+        tip_escaped = html.escape(f"{date_key}: {tip}", quote=True)
+        project_data = html.escape("|".join(p for p, _ in proj_list), quote=True)
+        project_counts_json = html.escape(json.dumps(proj_list), quote=True)
+        cell_by_date[date_key] = (
+            f'<span class="cell project-cell {intensity}" data-date="{date_key}" data-projects="{project_data}" data-proj-counts="{project_counts_json}" title="{tip_escaped}">{segments_html_for_projects(proj_list, intensity)}</span>'
+        )
+
     # Layout: one row per month, cells for each day (with padding for day-of-week)
-    month_rows: list[str] = []
+    cal = calendar.Calendar()  # firstweekday=0 (Mon), matching weekday() below
+    # Cells are appended to one flat list in document order and joined once,
+    # instead of join-per-month plus a second join over the month rows.
+    grid_parts: list[str] = []
     for year, month in months:
-        ndays = calendar.monthrange(year, month)[1]
-        row_cells = []
-        # Padding for day-of-week alignment: 1st of month starts on a weekday
-        first_weekday = datetime(year, month, 1).weekday()  # 0=Mon
-        for _ in range(first_weekday):
-            row_cells.append('<span class="cell empty"></span>')
-        for day in range(1, ndays + 1):
-            date_key = f"{year}-{month:02d}-{day:02d}"
-            projs = activity.get(date_key, {})
-            if not projs:
+        grid_parts.append(
+            f'<div class="month-row"><span class="month-label">{calendar.month_abbr[month]} {year}</span>'
+            '<div class="month-cells">'
+        )
+        month_prefix = f"{year}-{month:02d}-"
+        day_seen = False
+        # itermonthdays2 yields (day, weekday) pairs; day 0 marks pad slots
+        # before the 1st (kept, for day-of-week alignment) and after the last
+        # day (skipped).
+        for day, weekday in cal.itermonthdays2(year, month):
+            if day == 0:
+                if not day_seen:
+                    grid_parts.append('<span class="cell empty"></span>')
+                continue
+            day_seen = True
+            date_key = month_prefix + f"{day:02d}"
+            cell = cell_by_date.get(date_key)
+            if cell is None:
                 # Weekend (Sat=5, Sun=6) with no activity: show as day off
-                weekday = datetime(year, month, day).weekday()
                 weekend_class = " weekend" if weekday >= 5 else ""
-                row_cells.append(f'<span class="cell none{weekend_class}" title="{date_key}"></span>')
-                continue
-            # Sort by count descending for stable stripe order
-            proj_list = sorted(projs.items(), key=lambda x: -x[1])
-            total = sum(projs.values())
-            intensity = intensity_for_total(total)
-            tip = ", ".join(
-                f"{p}{' (archived)' if p.casefold() in archived_set else ''}: {c}"
-                for p, c in proj_list
-            )
-            tip_escaped = html.escape(f"{date_key}: {tip}", quote=True)
-            project_data = html.escape("|".join(p for p, _ in proj_list), quote=True)
-            project_counts_json = html.escape(json.dumps(proj_list), quote=True)
-            row_cells.append(
-                f'<span class="cell project-cell {intensity}" data-date="{date_key}" data-projects="{project_data}" data-proj-counts="{project_counts_json}" title="{tip_escaped}">{segments_html_for_projects(proj_list, intensity)}</span>'
-            )
-        month_label = datetime(year, month, 1).strftime("%b %Y")
-        month_rows.append(
-            f'<div class="month-row"><span class="month-label">{month_label}</span>'
-            + '<div class="month-cells">' + "".join(row_cells) + "</div></div>"
-        )
+                grid_parts.append(f'<span class="cell none{weekend_class}" title="{date_key}"></span>')
+            else:
+                grid_parts.append(cell)
+        grid_parts.append("</div></div>")
+    grid_html = "".join(grid_parts)
 
     legend = "".join(
         (
@@ -507,7 +596,7 @@ def generate_graph(log_path: Path, out_path: Path, open_browser: bool, archive_p
     <label><input id="show-archived" type="checkbox"> Show archived projects</label>
   </div>
   <div class="grid">
-    {"".join(month_rows)}
+    {grid_html}
   </div>
   <div class="intensity-legend">
     <span>Intensity:</span>
@@ -654,57 +743,57 @@ def run_backfill_github(log_path: Path, year: int, month: int) -> None:
             print("Run 'gh auth login' to authenticate.", file=sys.stderr)
         sys.exit(1)
 
-    # gh search commits returns commits; we filter by month in Python
-    result = subprocess.run(
+    # gh search commits returns commits; --jq '.[]' emits one JSON object per
+    # line so we can stream-parse instead of buffering the whole blob.
+    proc = subprocess.Popen(
         [
             "gh", "search", "commits",
             f"--author={username}",
             "--json", "repository,commit",
+            "--jq", ".[]",
             "--limit", "1000",
         ],
-        capture_output=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
         text=True,
     )
-    if result.returncode != 0:
-        msg = (result.stderr or result.stdout or "gh search failed").strip()
-        print(f"GitHub error: {msg}", file=sys.stderr)
-        sys.exit(1)
-
-    try:
-        items = json.loads(result.stdout)
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse gh output: {e}", file=sys.stderr)
-        sys.exit(1)
-
+    loads = orjson.loads if orjson is not None else json.loads
     prefix = f"{year}-{month:02d}-"
-    entries: list[tuple[str, str, str]] = []  # (date, project, ts)
-    for item in items:
-        try:
-            commit = item.get("commit") or {}
-            committer = commit.get("committer") or {}
-            date_str = committer.get("date")
-            if not date_str or not date_str.startswith(prefix):
+    appended = 0
+    with open(log_path, "ab") as f:
+        for line in proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = loads(line)
+                commit = item.get("commit") or {}
+                committer = commit.get("committer") or {}
+                ts = committer.get("date")
+                if not ts or not ts.startswith(prefix):
+                    continue
+                repo = (item.get("repository") or {}).get("name") or "unknown"
+            except (ValueError, KeyError, TypeError, AttributeError):
                 continue
-            day = date_str[:10]
-            repo = (item.get("repository") or {}).get("name") or "unknown"
-            entries.append((day, repo, date_str))
-        except (KeyError, TypeError):
-            continue
-
-    if not entries:
-        print(f"No commits found for {year}-{month:02d}.")
-        return
-
-    with open(log_path, "a") as f:
-        for day, project, ts in entries:
             entry = {
-                "date": day,
+                "date": ts[:10],
                 "ts": ts.replace("Z", "+00:00") if ts.endswith("Z") else ts,
-                "project": project,
+                "project": repo,
             }
-            f.write(json.dumps(entry) + "\n")
+            f.write(_dumps_line(entry))
+            appended += 1
+
+    stderr = proc.stderr.read()
+    if proc.wait() != 0:
+        msg = (stderr or "gh search failed").strip()
+        print(f"GitHub error: {msg}", file=sys.stderr)
+        sys.exit(1)
+
+    if not appended:
+        print(f"No commits found for {year}-{month:02d}.")
+        return
 
-    print(f"Appended {len(entries)} entries from GitHub ({year}-{month:02d}) to {log_path}")
+    print(f"Appended {appended} entries from GitHub ({year}-{month:02d}) to {log_path}")
 
 
 def main() -> None: